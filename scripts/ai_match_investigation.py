@@ -4,13 +4,73 @@ AI exact match検索の原因調査スクリプト
 現在57件しか見つからない原因を詳細分析
 """
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import html
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Set, Any
-from collections import defaultdict, Counter
+from typing import Dict, List, Set, Any, Optional
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import os
 import time
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Arrowの文字列列はPyArrowバックエンドのまま取り込む（str.containsをArrowのカーネルで処理させる）
+ARROW_STRING_TYPES = {
+    pa.string(): pd.StringDtype('pyarrow'),
+    pa.large_string(): pd.StringDtype('pyarrow'),
+}
+
+
+class RunSuffixPattern:
+    """「[文字クラス]*リテラル」形式のパターンを線形時間で検索する
+    
+    バックトラッキング型のreでは、文字クラスの連続部分の各位置から照合をやり直すため、
+    リテラルを含まない長い連続部分で二乗オーダーになる。リテラルの文字がすべて文字クラスに
+    含まれる場合、マッチは「リテラルを含む連続部分の先頭から最後のリテラルまで」に等しいので、
+    連続部分を一度だけ切り出して照合すれば re.findall と同じ結果が得られる。
+    """
+    
+    SHAPE = re.compile(r'(\[[^\]]+\])\*(.+)')
+    
+    def __init__(self, char_class: str, literal: str, flags: int = 0):
+        self.pattern = f'{char_class}*{literal}'
+        self._run_re = re.compile(f'{char_class}+', flags)
+        self._tail_re = re.compile(f'.*{literal}', flags | re.DOTALL)
+    
+    @classmethod
+    def compile(cls, pattern: str, flags: int = 0):
+        """対応する形式ならRunSuffixPattern、それ以外は通常のre.Patternを返す"""
+        shape = cls.SHAPE.fullmatch(pattern)
+        if shape:
+            char_class, literal = shape.groups()
+            char_re = re.compile(char_class, flags)
+            if re.escape(literal) == literal and all(char_re.fullmatch(c) for c in literal):
+                return cls(char_class, literal, flags)
+        return re.compile(pattern, flags)
+    
+    def findall(self, text: str) -> List[str]:
+        matches = []
+        for run in self._run_re.finditer(text):
+            tail = self._tail_re.match(run.group())
+            if tail:
+                matches.append(tail.group())
+        return matches
+
+
+def analyze_table_file(investigator: 'AIMatchInvestigator', table_name: str):
+    """テーブルをFeatherから読み込んで分析（プロセスプールから呼べるようモジュール関数にしている）"""
+    df, _ = investigator.read_search_table(table_name)
+    return investigator.analyze_table(table_name, df)
+
 
 class AIMatchInvestigator:
     """AI検索マッチング問題の調査クラス"""
@@ -38,7 +98,36 @@ class AIMatchInvestigator:
             r'[ア-ン\w]*AI', r'[ア-ン\w]*ＡＩ',  # 何か+AI
         ]
         
-        self.tables_data = {}
+        # パターンが必ず含む表記のグループ（1回の走査でセル内に現れるグループを判定する）
+        self.literal_families = {
+            'ascii': 'AI',
+            'fullwidth': 'ＡＩ',
+            'dotted': 'A.I.',
+            'fullwidth_dotted': 'Ａ.Ｉ.',
+        }
+        self._family_re = re.compile(
+            '|'.join(f'(?P<{name}>{re.escape(literal)})' for name, literal in self.literal_families.items()),
+            re.IGNORECASE
+        )
+        
+        # 事前フィルタ（どのパターンもいずれかの表記グループを含む）
+        self._prefilter_re = re.compile(
+            '|'.join(re.escape(literal) for literal in self.literal_families.values()),
+            re.IGNORECASE
+        )
+        
+        # パターンは起動時に一度だけコンパイル（不正なパターンはここで例外になる）
+        self._current_re = re.compile(self.current_pattern, re.IGNORECASE)
+        self._current_family = self.get_pattern_family(self.current_pattern)
+        # 「[ア-ン\w]*AI」のような後方一致パターンは線形時間の照合に置き換える
+        self._improved_res = [
+            (p, RunSuffixPattern.compile(p, re.IGNORECASE), self.get_pattern_family(p)) for p in self.improved_patterns
+        ]
+        self._compound_res = [
+            (p, RunSuffixPattern.compile(p, re.IGNORECASE), self.get_pattern_family(p)) for p in self.compound_patterns
+        ]
+        
+        self.table_names = []
         self.search_config = {}
         self.load_metadata()
     
@@ -60,7 +149,7 @@ class AIMatchInvestigator:
             }
     
     def load_feather_tables(self):
-        """Featherテーブル読み込み"""
+        """Featherテーブル確認（データ本体は分析時にテーブルごとに読み込む）"""
         print("Loading Feather tables for investigation...")
         
         for table_name in self.search_config.keys():
@@ -68,88 +157,139 @@ class AIMatchInvestigator:
             if feather_path.exists():
                 print(f"  Loading: {table_name}")
                 try:
-                    df = pd.read_feather(feather_path)
-                    self.tables_data[table_name] = df
-                    print(f"    Records: {len(df):,}, Columns: {len(df.columns)}")
+                    table = feather.read_table(feather_path, memory_map=True)
+                    self.table_names.append(table_name)
+                    print(f"    Records: {table.num_rows:,}, Columns: {table.num_columns}")
                 except Exception as e:
                     print(f"    Error loading {table_name}: {e}")
             else:
                 print(f"  Warning: {feather_path} not found")
     
-    def search_pattern_in_text(self, text: str, pattern: str) -> List[str]:
-        """テキスト内でパターンを検索"""
-        if not text or pd.isna(text):
-            return []
-        
-        text_str = str(text)
-        try:
-            matches = re.findall(pattern, text_str, re.IGNORECASE)
-            return matches
-        except re.error:
-            return []
+    def read_search_table(self, table_name: str):
+        """予算事業IDと検索対象フィールドだけを読み込む（全体の列数も返す）"""
+        table = feather.read_table(self.feather_dir / f"{table_name}.feather", memory_map=True)
+        columns = [c for c in ['予算事業ID', *self.search_config[table_name]] if c in table.column_names]
+        df = table.select(columns).to_pandas(types_mapper=ARROW_STRING_TYPES.get)
+        return df, table.num_columns
+    
+    def get_pattern_family(self, pattern: str) -> Optional[str]:
+        """パターンが必ず含む表記のグループ名を返す（判定できなければNone）"""
+        for name, literal in self.literal_families.items():
+            if re.escape(literal) in pattern:
+                return name
+        return None
+    
+    def analyze_table(self, table_name: str, df: pd.DataFrame):
+        """1テーブル分のパターン分析
+        
+        チェック件数と、現在/改善/複合語パターンそれぞれのマッチを
+        (project_id, field, row, pattern, matches) のタプルのリストで返す
+        """
+        current_matches = []
+        improved_matches = []
+        compound_matches = []
+        
+        records_checked = 0
+        search_fields = self.search_config.get(table_name, [])
+        available_fields = [f for f in search_fields if f in df.columns]
+        
+        if not available_fields:
+            return records_checked, current_matches, improved_matches, compound_matches
+        
+        # 列ごとに事前フィルタをかけ、候補行だけを詳細パターンで分析する
+        candidate_mask = pd.Series(False, index=df.index)
+        for field in available_fields:
+            texts = df[field].astype('string[pyarrow]')
+            records_checked += int((texts.notna() & (texts != '')).sum())
+            # コンパイル済みパターンを渡すとpandas 2.xでは例外、3.xではPythonのreにフォールバックするため、
+            # パターン文字列とcase=Falseで渡してArrowの正規表現カーネルで処理させる
+            candidate_mask |= texts.str.contains(self._prefilter_re.pattern, case=False, na=False, regex=True)
+        
+        # 予算事業IDはテーブル単位で一度だけ用意する（列なし・欠損は行番号で代替）
+        if '予算事業ID' in df.columns and not df['予算事業ID'].hasnans:
+            project_ids = df['予算事業ID']
+        else:
+            fallback_ids = pd.Series('unknown_' + df.index.astype(str), index=df.index)
+            if '予算事業ID' in df.columns:
+                project_ids = df['予算事業ID'].astype(object).fillna(fallback_ids)
+            else:
+                project_ids = fallback_ids
+        
+        # 候補行は列位置でタプル展開して走査する（行ごとのSeries生成を避ける）
+        candidates = df.loc[candidate_mask, available_fields]
+        for (idx, *texts), project_id in zip(candidates.itertuples(name=None), project_ids[candidate_mask]):
+            for field, text_str in zip(available_fields, texts):
+                if not isinstance(text_str, str) or not text_str:
+                    continue
+                
+                # セル内に現れる表記グループを1回の走査で求め、該当しないパターンは実行しない
+                families = {m.lastgroup for m in self._family_re.finditer(text_str)}
+                families.add(None)
+                
+                # 現在のパターン
+                current = []
+                if self._current_family in families:
+                    current = self._current_re.findall(text_str)
+                if current:
+                    current_matches.append((project_id, field, idx, self.current_pattern, current))
+                
+                # 改善されたパターン
+                for pattern, compiled, family in self._improved_res:
+                    if family not in families:
+                        continue
+                    improved = compiled.findall(text_str)
+                    if improved:
+                        improved_matches.append((project_id, field, idx, pattern, improved))
+                
+                # 複合語パターン
+                for pattern, compiled, family in self._compound_res:
+                    if family not in families:
+                        continue
+                    compound = compiled.findall(text_str)
+                    if compound:
+                        compound_matches.append((project_id, field, idx, pattern, compound))
+        
+        return records_checked, current_matches, improved_matches, compound_matches
+    
+    def group_matches(self, grouped: Dict, table_name: str, flat_matches: List[tuple], with_pattern: bool = True):
+        """マッチのタプルを事業ID別の詳細レコードとしてgroupedに追加"""
+        for project_id, field, row, pattern, matches in flat_matches:
+            record = {'table': table_name, 'field': field, 'row': row}
+            if with_pattern:
+                record['pattern'] = pattern
+            record['matches'] = matches
+            grouped.setdefault(project_id, []).append(record)
     
     def analyze_current_pattern_limitations(self) -> Dict:
         """現在のパターンの制限を分析"""
         print("\n=== Analyzing Current Pattern Limitations ===")
         
-        current_matches = defaultdict(list)
-        improved_matches = defaultdict(list)
-        compound_matches = defaultdict(list)
+        current_matches = {}
+        improved_matches = {}
+        compound_matches = {}
         
         total_records_checked = 0
         
-        for table_name, df in self.tables_data.items():
+        # テーブルごとの分析は独立しているのでプロセスプールで並列実行し、
+        # 結果はテーブル順に結合する（詳細の並びは逐次実行と同じ）
+        # 各テーブルは分析の間だけ読み込むので、保持するのは常に検索対象列の分だけ
+        table_names = self.table_names
+        max_workers = min(len(table_names), os.cpu_count() or 1)
+        if max_workers > 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(analyze_table_file, self, table_name) for table_name in table_names]
+                results = [future.result() for future in futures]
+        else:
+            # 1コアではプロセス起動のコストだけ増えるのでそのまま実行
+            results = [analyze_table_file(self, table_name) for table_name in table_names]
+        
+        # 事業ID別の詳細は全テーブル分のタプルから最後にまとめて組み立てる
+        for table_name, (records_checked, current, improved, compound) in zip(table_names, results):
             print(f"\nAnalyzing table: {table_name}")
-            search_fields = self.search_config.get(table_name, [])
-            available_fields = [f for f in search_fields if f in df.columns]
-            
-            if not available_fields:
-                continue
-            
-            for idx, record in df.iterrows():
-                project_id = record.get('予算事業ID', f'unknown_{idx}')
-                
-                for field in available_fields:
-                    text = record.get(field, '')
-                    if not text or pd.isna(text):
-                        continue
-                    
-                    text_str = str(text)
-                    total_records_checked += 1
-                    
-                    # 現在のパターン
-                    current = self.search_pattern_in_text(text_str, self.current_pattern)
-                    if current:
-                        current_matches[project_id].append({
-                            'table': table_name,
-                            'field': field,
-                            'text': text_str[:200],
-                            'matches': current
-                        })
-                    
-                    # 改善されたパターン
-                    for pattern in self.improved_patterns:
-                        improved = self.search_pattern_in_text(text_str, pattern)
-                        if improved:
-                            improved_matches[project_id].append({
-                                'table': table_name,
-                                'field': field,
-                                'text': text_str[:200],
-                                'pattern': pattern,
-                                'matches': improved
-                            })
-                    
-                    # 複合語パターン
-                    for pattern in self.compound_patterns:
-                        compound = self.search_pattern_in_text(text_str, pattern)
-                        if compound:
-                            compound_matches[project_id].append({
-                                'table': table_name,
-                                'field': field,
-                                'text': text_str[:200],
-                                'pattern': pattern,
-                                'matches': compound
-                            })
+            total_records_checked += records_checked
+            self.group_matches(current_matches, table_name, current, with_pattern=False)
+            self.group_matches(improved_matches, table_name, improved)
+            self.group_matches(compound_matches, table_name, compound)
         
         analysis = {
             'total_records_checked': total_records_checked,
@@ -171,6 +311,14 @@ class AIMatchInvestigator:
         
         return analysis
     
+    def get_match_text(self, match: Dict, columns: Dict) -> str:
+        """マッチ元セルのテキスト（先頭200文字）をFeatherから取得（columnsは列のキャッシュ）"""
+        key = (match['table'], match['field'])
+        if key not in columns:
+            feather_path = self.feather_dir / f"{match['table']}.feather"
+            columns[key] = feather.read_table(feather_path, columns=[match['field']], memory_map=True).column(0)
+        return str(columns[key][match['row']].as_py())[:200]
+    
     def find_missed_ai_instances(self, analysis: Dict) -> Dict:
         """見落とされたAIインスタンスを特定"""
         print("\n=== Finding Missed AI Instances ===")
@@ -185,6 +333,7 @@ class AIMatchInvestigator:
         
         # 具体例の収集
         missed_examples = []
+        source_columns = {}
         
         # 改善されたパターンで見つかったが現在のパターンで見落とされた例
         for project_id in list(missed_by_current)[:10]:  # 最初の10件
@@ -195,7 +344,7 @@ class AIMatchInvestigator:
                         'project_id': project_id,
                         'table': match['table'],
                         'field': match['field'],
-                        'text': match['text'],
+                        'text': self.get_match_text(match, source_columns),
                         'pattern': match['pattern'],
                         'matches': match['matches']
                     })
@@ -209,7 +358,7 @@ class AIMatchInvestigator:
                         'project_id': project_id,
                         'table': match['table'],
                         'field': match['field'],
-                        'text': match['text'],
+                        'text': self.get_match_text(match, source_columns),
                         'pattern': match['pattern'],
                         'matches': match['matches']
                     })
@@ -234,21 +383,17 @@ class AIMatchInvestigator:
         """詳細統計を生成"""
         
         # パターン別統計
-        pattern_stats = Counter()
-        for matches in analysis['improved_matches_detail'].values():
-            for match in matches:
-                pattern_stats[match['pattern']] += 1
-        
-        compound_stats = Counter()
-        for matches in analysis['compound_matches_detail'].values():
-            for match in matches:
-                compound_stats[match['pattern']] += 1
+        pattern_stats = Counter(
+            match['pattern'] for matches in analysis['improved_matches_detail'].values() for match in matches
+        )
+        compound_stats = Counter(
+            match['pattern'] for matches in analysis['compound_matches_detail'].values() for match in matches
+        )
         
         # テーブル別統計
-        table_stats = Counter()
-        for matches in analysis['improved_matches_detail'].values():
-            for match in matches:
-                table_stats[match['table']] += 1
+        table_stats = Counter(
+            match['table'] for matches in analysis['improved_matches_detail'].values() for match in matches
+        )
         
         statistics = {
             'summary': {
@@ -271,6 +416,19 @@ class AIMatchInvestigator:
         
         return statistics
     
+    def write_json(self, data: Dict, path: Path):
+        """JSON書き出し（orjsonがあれば使用）"""
+        if ORJSON_AVAILABLE:
+            with open(path, 'wb') as f:
+                f.write(orjson.dumps(
+                    data,
+                    default=str,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                ))
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    
     def save_investigation_results(self, analysis: Dict, missed_analysis: Dict, statistics: Dict):
         """調査結果を保存"""
         print("\nSaving investigation results...")
@@ -290,8 +448,7 @@ class AIMatchInvestigator:
         
         # JSON保存
         json_path = self.output_dir / 'ai_match_investigation_report.json'
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(full_report, f, ensure_ascii=False, indent=2, default=str)
+        self.write_json(full_report, json_path)
         print(f"  Full report saved: {json_path}")
         
         # 簡潔なサマリー保存
@@ -303,14 +460,13 @@ class AIMatchInvestigator:
             'key_issues': {
                 'word_boundary_restrictive': analysis['improved_pattern_matches'] > analysis['current_pattern_matches'],
                 'compound_terms_missed': analysis['compound_pattern_matches'] > 0,
-                'full_width_missed': 'ＡＩ' in str(analysis['improved_matches_detail'])
+                'full_width_missed': statistics['problem_analysis']['full_width_issue']
             },
             'recommended_patterns': self.improved_patterns + self.compound_patterns
         }
         
         summary_path = self.output_dir / 'ai_investigation_summary.json'
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        self.write_json(summary, summary_path)
         print(f"  Summary saved: {summary_path}")
         
         # HTMLレポート生成
@@ -319,7 +475,7 @@ class AIMatchInvestigator:
     def generate_html_report(self, statistics: Dict, missed_analysis: Dict):
         """HTML調査レポートを生成"""
         
-        html_content = f"""<!DOCTYPE html>
+        html_parts = [f"""<!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="UTF-8">
@@ -404,24 +560,24 @@ class AIMatchInvestigator:
     </div>
     
     <h2>📝 見落とし例（サンプル）</h2>
-"""
+"""]
 
-        # 見落とし例を追加
+        # 見落とし例を追加（本文由来の値はエスケープする）
         if missed_analysis.get('missed_examples'):
             for i, example in enumerate(missed_analysis['missed_examples'][:5]):
-                html_content += f"""
+                html_parts.append(f"""
     <div class="example">
         <strong>例 {i+1}: {example['type']}</strong><br>
-        <strong>プロジェクトID:</strong> {example['project_id']}<br>
-        <strong>テーブル:</strong> {example['table']}<br>
-        <strong>フィールド:</strong> {example['field']}<br>
-        <strong>マッチパターン:</strong> <span class="code">{example['pattern']}</span><br>
-        <strong>テキスト:</strong> {example['text'][:150]}...<br>
-        <strong>マッチ:</strong> {', '.join(example['matches'])}
+        <strong>プロジェクトID:</strong> {html.escape(str(example['project_id']))}<br>
+        <strong>テーブル:</strong> {html.escape(example['table'])}<br>
+        <strong>フィールド:</strong> {html.escape(example['field'])}<br>
+        <strong>マッチパターン:</strong> <span class="code">{html.escape(example['pattern'])}</span><br>
+        <strong>テキスト:</strong> {html.escape(example['text'][:150])}...<br>
+        <strong>マッチ:</strong> {html.escape(', '.join(example['matches']))}
     </div>
-"""
+""")
 
-        html_content += f"""
+        html_parts.append(f"""
     <h2>🔧 推奨改善案</h2>
     
     <div class="alert success">
@@ -438,7 +594,8 @@ class AIMatchInvestigator:
         Generated by AI Match Investigator
     </div>
 </body>
-</html>"""
+</html>""")
+        html_content = ''.join(html_parts)
         
         html_path = self.output_dir / 'ai_investigation_report.html'
         with open(html_path, 'w', encoding='utf-8') as f:
@@ -456,7 +613,7 @@ class AIMatchInvestigator:
         # 1. テーブル読み込み
         self.load_feather_tables()
         
-        if not self.tables_data:
+        if not self.table_names:
             print("No tables loaded. Exiting.")
             return None
         
@@ -4,21 +4,52 @@ AI事業 究極の完全スプレッドシート作成
 全444カラムを含む完全版
 """
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+import codecs
+import hashlib
 import json
 import re
+import sys
 from pathlib import Path
 from typing import Dict, List, Set, Any
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import os
 import time
 import warnings
 warnings.filterwarnings('ignore')
 
+# Arrowの文字列型をpandasのArrowバックエンドstring型へ対応付け
+ARROW_STRING_TYPES = {
+    pa.string(): pd.StringDtype('pyarrow'),
+    pa.large_string(): pd.StringDtype('pyarrow'),
+}
+
+# 予算事業IDとして扱うカラム（優先順）と、出力の先頭に置くAI関連カラム
+ID_COLUMNS = ('予算事業ID', '予算事業コード', '事業ID')
+ID_COLUMN_SET = frozenset(ID_COLUMNS)
+AI_COLUMNS = ('予算事業ID', 'AI_検出_詳細', 'AI_マッチ_数')
+
+# 出力ファイルの書き込みバッファ（書き込みのシステムコール回数を減らす）
+OUTPUT_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Excel出力はxlsxwriterが利用可能ならそちらを使用（openpyxlより高速）
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_ENGINE = 'xlsxwriter'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
 
 class AIUltimateSpreadsheetGenerator:
     """AI事業究極のスプレッドシート生成クラス"""
     
-    def __init__(self, feather_dir: str = "data/full_feather"):
+    def __init__(self, feather_dir: str = "data/full_feather", use_cache: bool = True):
         self.feather_dir = Path(feather_dir)
+        self.use_cache = use_cache
         self.output_dir = Path("data/ai_ultimate_spreadsheet")
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -29,10 +60,26 @@ class AIUltimateSpreadsheetGenerator:
             r'(?<![a-zA-Z])AI(?![a-zA-Z])',  # より精密な半角AI
             r'(?<![ａ-ｚＡ-Ｚ])ＡＩ(?![ａ-ｚＡ-Ｚ])'  # より精密な全角AI
         ]
-        
-        self.tables_data = {}
+        # 列単位の一括検索用に1つの正規表現へ統合する
+        # 単語境界つきの2パターンは「より精密な」2パターンに包含される（\bの前後は英字にならない）ため、
+        # 統合時は後者の2つだけを交互に試せば同じ位置・同じ文字列にマッチする
+        self.basic_ai_regex = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in self.basic_ai_patterns[2:]),
+            re.IGNORECASE
+        )
+        # 正規表現の前段で使う部分文字列フィルタ（Arrowのネイティブ検索で候補行を絞る）
+        self.basic_ai_prefilter = 'ai|ａｉ'
+        
+        # 出力カラムの絞り込み（テーブル名 -> カラム名リスト）
+        # 未指定のテーブルは従来どおり全カラムを出力する
+        self.output_fields: Dict[str, List[str]] = {}
+        
+        self.arrow_tables = {}  # 全カラム（メモリマップ）
+        self.tables_data = {}   # AI検索用カラムのみ
+        self.table_plans = {}   # テーブル名 -> {'id_col': 予算事業IDカラム, 'search_fields': 検索対象カラム}
         self.metadata = {}
         self.column_mapping = {}
+        self.ai_match_details = defaultdict(dict)  # 予算事業ID -> テーブル名 -> [(テーブル.フィールド, マッチ文字列)]
         self.load_metadata()
     
     def load_metadata(self):
@@ -60,93 +107,149 @@ class AIUltimateSpreadsheetGenerator:
         
         total_columns = 0
         
-        for table_name, info in self.column_mapping.items():
-            feather_path = self.feather_dir / f"{table_name}.feather"
+        ai_search_fields = self.metadata.get('ai_search_fields', {})
+        
+        # Feather読み込みはArrow側でGILを解放するため、全テーブルを並列に読み込む
+        # メモリマップで開き、pandasへの変換はAI検索に使うカラムだけに限定する
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+            futures = {}
+            for table_name in self.column_mapping:
+                feather_path = self.feather_dir / f"{table_name}.feather"
+                if feather_path.exists():
+                    futures[table_name] = executor.submit(feather.read_table, feather_path, memory_map=True)
+                else:
+                    print(f"  Warning: {feather_path} not found")
             
-            if feather_path.exists():
-                print(f"  Loading: {table_name} ({info['japanese_name']})")
+            # テーブル順序を保つため、完了順ではなく登録順に結果を取り出す
+            for table_name, future in futures.items():
+                print(f"  Loading: {table_name} ({self.column_mapping[table_name]['japanese_name']})")
                 try:
-                    df = pd.read_feather(feather_path)
-                    self.tables_data[table_name] = df
-                    total_columns += len(df.columns)
-                    print(f"    Records: {len(df):,}, Columns: {len(df.columns)}")
+                    table = future.result()
+                    self.arrow_tables[table_name] = table
+                    
+                    # IDカラムと検索対象カラムはテーブルごとに一度だけ決めておく
+                    id_col = next((col for col in ID_COLUMNS if col in table.column_names), None)
+                    search_fields = [f for f in ai_search_fields.get(table_name, []) if f in table.column_names]
+                    self.table_plans[table_name] = {'id_col': id_col, 'search_fields': search_fields}
+                    
+                    if table_name in ai_search_fields:
+                        scan_columns = ([id_col] if id_col else []) + search_fields
+                        # 文字列カラムはArrowバックエンドのstring型で保持し、連続バッファ上で検索する
+                        scan_df = table.select(scan_columns).to_pandas(types_mapper=ARROW_STRING_TYPES.get)
+                        
+                        # 予算事業IDは読み込み時に一度だけ整数型へ揃える（通常はint16のまま）
+                        if id_col and not pd.api.types.is_integer_dtype(scan_df[id_col]):
+                            scan_df[id_col] = pd.to_numeric(scan_df[id_col], errors='coerce').astype('Int32')
+                        
+                        self.tables_data[table_name] = scan_df
+                    total_columns += table.num_columns
+                    print(f"    Records: {table.num_rows:,}, Columns: {table.num_columns}")
                 except Exception as e:
                     print(f"    Error loading {table_name}: {e}")
-            else:
-                print(f"  Warning: {feather_path} not found")
         
-        print(f"\\nLoaded {len(self.tables_data)} tables with {total_columns} total columns")
+        print(f"\\nLoaded {len(self.arrow_tables)} tables with {total_columns} total columns")
     
     def is_basic_ai_match(self, text: str) -> List[Dict]:
         """基本形AIマッチをチェック"""
-        if not text or pd.isna(text):
+        if pd.isna(text) or not text:
             return []
         
-        text_str = str(text)
-        matches = []
-        
-        for pattern in self.basic_ai_patterns:
-            try:
-                found = re.finditer(pattern, text_str, re.IGNORECASE)
-                for match in found:
-                    matched_text = match.group()
-                    if matched_text.upper() in ['AI', 'ＡＩ']:
-                        matches.append({
-                            'pattern': pattern,
-                            'matched_text': matched_text,
-                            'position': f"{match.start()}-{match.end()}"
-                        })
-            except re.error:
-                continue
-        
-        return matches
+        # 統合済みの正規表現で1回だけ走査する（同一箇所の重複カウントを防ぐ）
+        return [
+            {
+                'matched_text': match.group(),
+                'position': f"{match.start()}-{match.end()}"
+            }
+            for match in self.basic_ai_regex.finditer(str(text))
+        ]
+    
+    def contains_basic_ai(self, texts: pd.Series) -> pd.Series:
+        """列単位で基本形AIを含むかを判定"""
+        if not isinstance(texts.dtype, pd.StringDtype) or texts.dtype.storage != 'pyarrow':
+            texts = texts.astype('string[pyarrow]')
+        
+        # 大文字小文字を無視した部分文字列検索で候補を絞り、候補行だけ正規表現で確認する
+        # 確認用の正規表現は後読みを含みフラグ付きでコンパイル済みのため、Arrowの正規表現カーネル（RE2）ではなく
+        # object型でPythonのreに渡す（pandas 2.xのArrow文字列はコンパイル済みパターンを受け付けない）
+        candidates = texts.str.contains(self.basic_ai_prefilter, case=False, na=False)
+        mask = pd.Series(False, index=texts.index)
+        if candidates.any():
+            mask[candidates] = texts[candidates].astype(object).str.contains(self.basic_ai_regex, na=False)
+        return mask
+    
+    def join_unique_values(self, ids: pd.Series, values: pd.Series) -> pd.Series:
+        """事業ごとに重複を除いた非空値を出現順に ' | ' で連結"""
+        pairs = pd.DataFrame({'id': ids, 'value': values}).dropna(subset=['value'])
+        pairs['value'] = pairs['value'].astype(str)
+        pairs = pairs[(pairs['value'] != '') & (pairs['value'] != 'nan')].drop_duplicates()
+        return pairs.groupby('id', sort=False)['value'].agg(' | '.join)
+    
+    def group_columns_by_table(self, columns, table_names) -> Dict[str, List[str]]:
+        """「テーブル名_カラム名」形式のカラムを1回の走査でテーブル別に振り分け（カラム順を保持）"""
+        prefixes = {f"{table_name}_": table_name for table_name in table_names}
+        grouped = defaultdict(list)
+        for col in columns:
+            # テーブル名自体に「_」を含むため、各「_」までの接頭辞を順に照合する
+            pos = col.find('_')
+            while pos != -1:
+                table_name = prefixes.get(col[:pos + 1])
+                if table_name is not None:
+                    grouped[table_name].append(col)
+                pos = col.find('_', pos + 1)
+        return grouped
     
     def find_ai_projects(self) -> Set[int]:
         """基本形AI事業を特定（メタデータの検索フィールドを使用）"""
         print("\\nFinding AI projects using comprehensive search...")
         
         ai_projects = set()
-        search_summary = defaultdict(int)
+        search_summary = {}
         
         # メタデータから検索フィールドを取得
         ai_search_fields = self.metadata.get('ai_search_fields', {})
         
-        for table_name, search_fields in ai_search_fields.items():
+        for table_name in ai_search_fields:
             if table_name not in self.tables_data:
                 continue
             
             df = self.tables_data[table_name]
             print(f"  Searching in {table_name} ({self.column_mapping[table_name]['japanese_name']})...")
             
-            available_fields = [f for f in search_fields if f in df.columns]
+            available_fields = self.table_plans[table_name]['search_fields']
             if not available_fields:
                 print(f"    No searchable fields found")
                 continue
             
-            matches_found = 0
+            # 予算事業IDカラムの特定
+            id_col = self.table_plans[table_name]['id_col']
+            if not id_col:
+                print(f"    No project ID column found")
+                continue
             
-            for idx, row in df.iterrows():
-                # 予算事業IDの取得
-                project_id = None
-                for col in ['予算事業ID', '予算事業コード', '事業ID']:
-                    if col in row and pd.notna(row[col]):
-                        try:
-                            project_id = int(row[col])
-                            break
-                        except (ValueError, TypeError):
-                            continue
-                
-                if not project_id:
-                    continue
-                
-                # AI検索
-                for field in available_fields:
-                    text = row.get(field, '')
-                    if self.is_basic_ai_match(text):
-                        ai_projects.add(project_id)
-                        matches_found += 1
-                        search_summary[table_name] += 1
-                        break
+            project_ids = df[id_col]
+            
+            # AI検索（行ごとではなく列単位でまとめて判定）
+            mask = pd.Series(False, index=df.index)
+            for field in available_fields:
+                mask |= self.contains_basic_ai(df[field])
+            mask &= project_ids.notna() & (project_ids != 0)
+            
+            # マッチ件数はブール配列の合計で一括集計
+            matches_found = int(mask.sum())
+            search_summary[table_name] = matches_found
+            
+            matched_project_ids = project_ids[mask].astype('int64')
+            ai_projects.update(int(pid) for pid in matched_project_ids.unique())
+            
+            # マッチした行だけAI検出詳細を記録し、データ収集時に再走査しない
+            # 「テーブル.フィールド」とマッチ文字列は共有オブジェクトで保持し、文字列化は出力時に行う
+            field_labels = [sys.intern(f"{table_name}.{field}") for field in available_fields]
+            matched_rows = df.loc[mask, available_fields].itertuples(index=False, name=None)
+            for project_id, row in zip(matched_project_ids, matched_rows):
+                table_details = self.ai_match_details[int(project_id)].setdefault(table_name, [])
+                for field_label, text in zip(field_labels, row):
+                    for match in self.is_basic_ai_match(text):
+                        table_details.append((field_label, sys.intern(match['matched_text'])))
             
             print(f"    Found {matches_found} AI matches")
         
@@ -162,108 +265,62 @@ class AIUltimateSpreadsheetGenerator:
         print(f"\\nCollecting ULTIMATE data for {len(project_ids)} projects...")
         print("Including ALL 444 columns from ALL tables...")
         
-        all_project_data = []
-        column_stats = defaultdict(int)
+        sorted_ids = sorted(project_ids)
         
-        for project_id in sorted(project_ids):
-            project_record = {
-                '予算事業ID': project_id,
-                'AI_検出_詳細': '',
-                'AI_マッチ_数': 0
-            }
+        table_frames = []
+        
+        for table_name, table in self.arrow_tables.items():
+            # プロジェクトIDカラムを特定
+            id_col = self.table_plans[table_name]['id_col']
+            if not id_col:
+                continue
             
-            ai_matches_detail = []
-            total_ai_matches = 0
+            # 出力対象カラム（指定がなければ全カラム）
+            table_columns = set(table.column_names)
+            output_cols = [
+                col for col in self.output_fields.get(table_name, table.column_names)
+                if col in table_columns and col not in ID_COLUMN_SET
+            ]
             
-            # 全テーブルから全カラムのデータを収集
-            for table_name, df in self.tables_data.items():
-                # プロジェクトIDカラムを特定
-                id_col = None
-                for col in ['予算事業ID', '予算事業コード', '事業ID']:
-                    if col in df.columns:
-                        id_col = col
-                        break
-                
-                if not id_col:
-                    continue
-                
-                # プロジェクトのデータを抽出
-                try:
-                    project_df = df[df[id_col] == project_id]
-                except:
-                    continue
-                
-                if project_df.empty:
-                    # データがない場合も全カラムを空値で追加
-                    for col in df.columns:
-                        if col not in ['予算事業ID', '予算事業コード', '事業ID']:
-                            prefixed_col = f"{table_name}_{col}"
-                            project_record[prefixed_col] = ''
-                    continue
-                
-                # 全カラムのデータを追加（例外なく全て）
-                for col in df.columns:
-                    if col in ['予算事業ID', '予算事業コード', '事業ID']:
-                        continue
-                    
-                    prefixed_col = f"{table_name}_{col}"
-                    
-                    # 複数レコードがある場合の処理
-                    values = project_df[col].dropna()
-                    
-                    if len(values) > 0:
-                        try:
-                            # 数値型の場合
-                            if pd.api.types.is_numeric_dtype(values):
-                                unique_values = values.unique()
-                                if len(unique_values) == 1:
-                                    project_record[prefixed_col] = str(unique_values[0])
-                                else:
-                                    project_record[prefixed_col] = ' | '.join(map(str, unique_values))
-                                column_stats[prefixed_col] += 1
-                            else:
-                                # 文字列型の場合
-                                str_values = values.astype(str).unique()
-                                clean_values = [v for v in str_values if v and v != 'nan']
-                                if clean_values:
-                                    project_record[prefixed_col] = ' | '.join(clean_values)
-                                    column_stats[prefixed_col] += 1
-                                else:
-                                    project_record[prefixed_col] = ''
-                        except Exception as e:
-                            # エラー時は文字列として処理
-                            str_values = values.astype(str).unique()
-                            clean_values = [v for v in str_values if v and v != 'nan']
-                            project_record[prefixed_col] = ' | '.join(clean_values) if clean_values else ''
-                    else:
-                        project_record[prefixed_col] = ''
-                
-                # AI検出詳細の収集
-                ai_search_fields = self.metadata.get('ai_search_fields', {})
-                if table_name in ai_search_fields:
-                    search_fields = ai_search_fields[table_name]
-                    available_fields = [f for f in search_fields if f in df.columns]
-                    
-                    for idx, row in project_df.iterrows():
-                        for field in available_fields:
-                            text = row.get(field, '')
-                            matches = self.is_basic_ai_match(text)
-                            if matches:
-                                for match in matches:
-                                    ai_matches_detail.append(f"{table_name}.{field}: {match['matched_text']}")
-                                    total_ai_matches += 1
+            # 対象事業の行・出力対象カラムだけをpandasへ変換
+            target_ids = pa.array(sorted_ids).cast(table.schema.field(id_col).type)
+            target_table = table.filter(pc.is_in(table[id_col], value_set=target_ids))
+            target_df = target_table.select([id_col] + output_cols).to_pandas()
             
-            # AI検出詳細を追加
-            project_record['AI_検出_詳細'] = ' | '.join(ai_matches_detail)
-            project_record['AI_マッチ_数'] = total_ai_matches
+            # 出力対象カラムのデータを事業単位で集約
+            joined_columns = {}
+            for col in output_cols:
+                joined_columns[f"{table_name}_{col}"] = self.join_unique_values(target_df[id_col], target_df[col])
             
-            all_project_data.append(project_record)
-        
-        # DataFrameに変換
-        df_ultimate = pd.DataFrame(all_project_data)
+            table_frames.append(pd.DataFrame(joined_columns, columns=list(joined_columns)))
+        
+        # テーブル別データを横方向に結合し、データがない事業も全カラムを空値で保持
+        data_df = pd.concat(table_frames, axis=1).reindex(sorted_ids).fillna('')
+        
+        # AI検出詳細（検索時に記録済み）をテーブル順に連結
+        ai_detail_map = {
+            project_id: [
+                detail
+                for table_name in self.arrow_tables
+                for detail in table_details.get(table_name, [])
+            ]
+            for project_id, table_details in self.ai_match_details.items()
+        }
+        ai_matches = data_df.index.map(lambda project_id: ai_detail_map.get(project_id, []))
+        
+        ai_frame = pd.DataFrame({
+            '予算事業ID': data_df.index,
+            'AI_検出_詳細': [
+                ' | '.join(f"{field_label}: {matched_text}" for field_label, matched_text in details)
+                for details in ai_matches
+            ],
+            'AI_マッチ_数': [len(details) for details in ai_matches]
+        }, index=data_df.index)
+        df_ultimate = pd.concat([ai_frame, data_df], axis=1).reset_index(drop=True)
+        column_stats = (df_ultimate.iloc[:, 3:] != '').sum()
         
         # カラムを整理（AI関連、テーブル順）
-        ai_cols = ['予算事業ID', 'AI_検出_詳細', 'AI_マッチ_数']
+        ai_cols = list(AI_COLUMNS)
         
         # テーブル順にカラムを整理（カテゴリ順）
         table_order = ['organizations', 'projects', 'policies_laws', 'subsidies', 'related_projects',
@@ -271,10 +328,10 @@ class AIUltimateSpreadsheetGenerator:
                       'evaluations', 'expenditure_info', 'expenditure_connections', 
                       'expenditure_details', 'contracts', 'remarks']
         
+        columns_by_table = self.group_columns_by_table(df_ultimate.columns, table_order)
         other_cols = []
         for table in table_order:
-            table_cols = [col for col in df_ultimate.columns if col.startswith(f"{table}_")]
-            other_cols.extend(sorted(table_cols))
+            other_cols.extend(sorted(columns_by_table.get(table, [])))
         
         # 最終的なカラム順序
         ordered_cols = ai_cols + other_cols
@@ -284,11 +341,11 @@ class AIUltimateSpreadsheetGenerator:
         print(f"\\nUltimate data collection complete:")
         print(f"  Projects: {len(df_ultimate)}")
         print(f"  Total columns: {len(df_ultimate.columns)} (target: 444+3)")
-        print(f"  Columns with data: {len([col for col, count in column_stats.items() if count > 0])}")
+        print(f"  Columns with data: {int((column_stats > 0).sum())}")
         
         # テーブル別カラム数を表示
         for table in table_order:
-            table_cols = [col for col in df_ultimate.columns if col.startswith(f"{table}_")]
+            table_cols = columns_by_table.get(table, [])
             if table_cols and table in self.column_mapping:
                 japanese_name = self.column_mapping[table]['japanese_name']
                 print(f"  {table} ({japanese_name}): {len(table_cols)} columns")
@@ -315,16 +372,16 @@ class AIUltimateSpreadsheetGenerator:
             'completeness_analysis': {}
         }
         
+        # 全カラムの充実度（非空セルの割合）を一括で計算しておく
+        column_coverage = ((df.notna() & (df != '')).sum() / len(df)) * 100
+        
         # テーブル別カラム数と充実度
+        columns_by_table = self.group_columns_by_table(df.columns, self.column_mapping)
         for table_name, info in self.column_mapping.items():
-            table_cols = [col for col in df.columns if col.startswith(f"{table_name}_")]
+            table_cols = columns_by_table.get(table_name, [])
             if table_cols:
                 # データ充実度計算
-                coverage_stats = {}
-                for col in table_cols:
-                    non_empty = df[col].notna() & (df[col] != '')
-                    coverage_pct = (non_empty.sum() / len(df)) * 100
-                    coverage_stats[col] = round(coverage_pct, 1)
+                coverage_stats = {col: round(column_coverage[col], 1) for col in table_cols}
                 
                 avg_coverage = round(sum(coverage_stats.values()) / len(coverage_stats), 1) if coverage_stats else 0
                 
@@ -339,10 +396,8 @@ class AIUltimateSpreadsheetGenerator:
         
         # 全体のデータ充実度（上位50カラム）
         all_coverage = {}
-        for col in df.columns:
+        for col, coverage_pct in column_coverage.items():
             if not col.startswith('AI_') and col != '予算事業ID':
-                non_empty = df[col].notna() & (df[col] != '')
-                coverage_pct = (non_empty.sum() / len(df)) * 100
                 if coverage_pct > 0:
                     all_coverage[col] = round(coverage_pct, 1)
         
@@ -356,101 +411,132 @@ class AIUltimateSpreadsheetGenerator:
             ministry_counts = df[ministry_col].value_counts().head(20)
             summary['ministry_distribution'] = ministry_counts.to_dict()
         
-        # 完全性分析
+        # 完全性分析（非欠損マスクはNumPy配列として一度だけ作り、行・全体の集計に使い回す）
+        not_null = df.notna().to_numpy()
+        row_counts = not_null.sum(axis=1)
+        total_non_null = not_null.sum()
         summary['completeness_analysis'] = {
-            'perfect_records': len(df[df.notna().all(axis=1)]),  # 全カラムにデータがあるレコード数
-            'mostly_complete': len(df[df.notna().sum(axis=1) > len(df.columns) * 0.8]),  # 80%以上のカラムにデータ
-            'basic_complete': len(df[df.notna().sum(axis=1) > len(df.columns) * 0.5]),  # 50%以上のカラムにデータ
-            'total_non_null_cells': df.notna().sum().sum(),
+            'perfect_records': int((row_counts == len(df.columns)).sum()),  # 全カラムにデータがあるレコード数
+            'mostly_complete': int((row_counts > len(df.columns) * 0.8).sum()),  # 80%以上のカラムにデータ
+            'basic_complete': int((row_counts > len(df.columns) * 0.5).sum()),  # 50%以上のカラムにデータ
+            'total_non_null_cells': total_non_null,
             'total_possible_cells': len(df) * len(df.columns),
-            'overall_completeness': round((df.notna().sum().sum() / (len(df) * len(df.columns))) * 100, 2)
+            'overall_completeness': round((total_non_null / (len(df) * len(df.columns))) * 100, 2)
         }
         
         return summary
     
+    def write_csv(self, df: pd.DataFrame, csv_path: Path):
+        """CSVをUTF-8(BOM付き)で保存（pyarrowのCSVライターを優先）"""
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with open(csv_path, 'wb', buffering=OUTPUT_BUFFER_SIZE) as f:
+                f.write(codecs.BOM_UTF8)
+                pacsv.write_csv(table, f)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Arrowへ変換できない型が混在する場合はpandasで出力
+            with open(csv_path, 'w', encoding='utf-8-sig', newline='', buffering=OUTPUT_BUFFER_SIZE) as f:
+                df.to_csv(f, index=False)
+    
+    def write_excel(self, df: pd.DataFrame, summary: Dict, excel_path: Path):
+        """Excelブック（データ・基本統計・テーブル別統計）を保存"""
+        with pd.ExcelWriter(excel_path, engine=EXCEL_ENGINE) as writer:
+            df.to_excel(writer, sheet_name='AI事業完全データ', index=False, na_rep='')
+            
+            # サマリーシート
+            summary_data = []
+            for key, value in summary['basic_statistics'].items():
+                summary_data.append([key, value])
+            summary_df = pd.DataFrame(summary_data, columns=['項目', '値'])
+            summary_df.to_excel(writer, sheet_name='基本統計', index=False)
+            
+            # テーブル別統計
+            table_data = []
+            for table, stats in summary['table_breakdown'].items():
+                table_data.append([
+                    table, stats['japanese_name'], stats['category'],
+                    stats['total_columns'], stats['average_coverage']
+                ])
+            table_df = pd.DataFrame(table_data, 
+                columns=['テーブル', '日本語名', 'カテゴリ', 'カラム数', '平均充実度'])
+            table_df.to_excel(writer, sheet_name='テーブル別統計', index=False)
+    
     def save_ultimate_output(self, df: pd.DataFrame, summary: Dict):
         """究極のスプレッドシートを保存"""
         print("\\nSaving ULTIMATE spreadsheet...")
         
-        # CSVで保存（全カラム対応）
         csv_path = self.output_dir / 'ai_ultimate_all_444_columns.csv'
-        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-        print(f"  CSV saved: {csv_path} ({len(df.columns)} columns)")
-        
-        # Parquet保存（効率的）
         parquet_path = self.output_dir / 'ai_ultimate_all_444_columns.parquet'
-        df.to_parquet(parquet_path, index=False, compression='snappy')
-        print(f"  Parquet saved: {parquet_path}")
-        
-        # Excel保存（可能な場合）
         excel_path = self.output_dir / 'ai_ultimate_all_444_columns.xlsx'
-        if len(df.columns) <= 16384:
-            try:
-                with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-                    df.to_excel(writer, sheet_name='AI事業完全データ', index=False)
-                    
-                    # サマリーシート
-                    summary_data = []
-                    for key, value in summary['basic_statistics'].items():
-                        summary_data.append([key, value])
-                    summary_df = pd.DataFrame(summary_data, columns=['項目', '値'])
-                    summary_df.to_excel(writer, sheet_name='基本統計', index=False)
-                    
-                    # テーブル別統計
-                    table_data = []
-                    for table, stats in summary['table_breakdown'].items():
-                        table_data.append([
-                            table, stats['japanese_name'], stats['category'],
-                            stats['total_columns'], stats['average_coverage']
-                        ])
-                    table_df = pd.DataFrame(table_data, 
-                        columns=['テーブル', '日本語名', 'カテゴリ', 'カラム数', '平均充実度'])
-                    table_df.to_excel(writer, sheet_name='テーブル別統計', index=False)
-                
-                print(f"  Excel saved: {excel_path}")
-            except Exception as e:
-                print(f"  Excel save error: {e}")
-        else:
-            print(f"  Excel column limit exceeded ({len(df.columns)} > 16384)")
-        
-        # 完全カラムリスト保存
-        columns_path = self.output_dir / 'ultimate_columns_list.txt'
-        with open(columns_path, 'w', encoding='utf-8') as f:
-            f.write(f"AI事業 究極の完全スプレッドシート\\n")
-            f.write(f"Total columns: {len(df.columns)}\\n")
-            f.write("="*100 + "\\n\\n")
+        
+        # CSV・Parquet・Excelの書き出しはバックグラウンドで行い、カラムリスト・JSON・HTMLの生成と重ねる
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            csv_future = executor.submit(self.write_csv, df, csv_path)  # 全カラム対応
+            # Parquetは同じ値の多い連結文字列カラムが中心のため、辞書エンコーディング＋zstdで圧縮し、
+            # 辞書を全行で共有できるよう1つの行グループにまとめる
+            parquet_future = executor.submit(
+                df.to_parquet, parquet_path, index=False, engine='pyarrow',
+                compression='zstd', compression_level=3, use_dictionary=True, row_group_size=max(1, len(df))
+            )
+            excel_future = None
+            if len(df.columns) <= 16384:
+                excel_future = executor.submit(self.write_excel, df, summary, excel_path)
+            
+            # 完全カラムリスト保存
+            columns_path = self.output_dir / 'ultimate_columns_list.txt'
+            with open(columns_path, 'w', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+                f.write(f"AI事業 究極の完全スプレッドシート\\n")
+                f.write(f"Total columns: {len(df.columns)}\\n")
+                f.write("="*100 + "\\n\\n")
+            
+                # AI関連カラム
+                f.write("[AI関連メタデータ] - 3 columns\\n")
+                f.write("-"*50 + "\\n")
+                for col in AI_COLUMNS:
+                    if col in df.columns:
+                        f.write(f"  {col}\\n")
+            
+                # テーブル別カラム
+                columns_by_table = self.group_columns_by_table(df.columns, self.column_mapping)
+                for table_name, info in self.column_mapping.items():
+                    table_cols = columns_by_table.get(table_name, [])
+                    if table_cols:
+                        f.write(f"\\n[{table_name}] {info['japanese_name']} ({info['category']}) - {len(table_cols)} columns\\n")
+                        f.write("-"*80 + "\\n")
+                        for col in table_cols:
+                            clean_col = col.replace(f"{table_name}_", "")
+                            f.write(f"  {clean_col}\\n")
+            
+            print(f"  Column list saved: {columns_path}")
+            
+            # サマリーJSON保存
+            summary_path = self.output_dir / 'ultimate_summary.json'
+            with open(summary_path, 'w', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+            print(f"  Summary saved: {summary_path}")
+            
+            # HTMLレポート生成
+            self.generate_ultimate_html_report(df, summary)
+            
+            # バックグラウンドの書き出し完了を待つ
+            csv_future.result()
+            print(f"  CSV saved: {csv_path} ({len(df.columns)} columns)")
             
-            # AI関連カラム
-            f.write("[AI関連メタデータ] - 3 columns\\n")
-            f.write("-"*50 + "\\n")
-            for col in ['予算事業ID', 'AI_検出_詳細', 'AI_マッチ_数']:
-                if col in df.columns:
-                    f.write(f"  {col}\\n")
+            parquet_future.result()
+            print(f"  Parquet saved: {parquet_path}")
             
-            # テーブル別カラム
-            for table_name, info in self.column_mapping.items():
-                table_cols = [col for col in df.columns if col.startswith(f"{table_name}_")]
-                if table_cols:
-                    f.write(f"\\n[{table_name}] {info['japanese_name']} ({info['category']}) - {len(table_cols)} columns\\n")
-                    f.write("-"*80 + "\\n")
-                    for col in table_cols:
-                        clean_col = col.replace(f"{table_name}_", "")
-                        f.write(f"  {clean_col}\\n")
-        
-        print(f"  Column list saved: {columns_path}")
-        
-        # サマリーJSON保存
-        summary_path = self.output_dir / 'ultimate_summary.json'
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
-        print(f"  Summary saved: {summary_path}")
-        
-        # HTMLレポート生成
-        self.generate_ultimate_html_report(df, summary)
+            if excel_future is not None:
+                try:
+                    excel_future.result()
+                    print(f"  Excel saved: {excel_path}")
+                except Exception as e:
+                    print(f"  Excel save error: {e}")
+            else:
+                print(f"  Excel column limit exceeded ({len(df.columns)} > 16384)")
     
     def generate_ultimate_html_report(self, df: pd.DataFrame, summary: Dict):
         """究極のHTMLレポートを生成"""
-        html_content = f"""<!DOCTYPE html>
+        html_parts = [f"""<!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="UTF-8">
@@ -544,11 +630,11 @@ class AIUltimateSpreadsheetGenerator:
                         <th>進捗</th>
                     </tr>
                 </thead>
-                <tbody>"""
+                <tbody>"""]
         
         for table, stats in summary['table_breakdown'].items():
             coverage = stats['average_coverage']
-            html_content += f"""
+            html_parts.append(f"""
                     <tr>
                         <td><strong>{table}</strong></td>
                         <td>{stats['japanese_name']}</td>
@@ -560,9 +646,9 @@ class AIUltimateSpreadsheetGenerator:
                                 <div class="progress-fill" style="width: {coverage}%"></div>
                             </div>
                         </td>
-                    </tr>"""
+                    </tr>""")
         
-        html_content += f"""
+        html_parts.append(f"""
                 </tbody>
             </table>
         </div>
@@ -577,19 +663,19 @@ class AIUltimateSpreadsheetGenerator:
                         <th>割合</th>
                     </tr>
                 </thead>
-                <tbody>"""
+                <tbody>""")
         
         total_projects = summary['basic_statistics']['total_projects']
         for ministry, count in list(summary.get('ministry_distribution', {}).items())[:10]:
             percentage = round((count / total_projects) * 100, 1)
-            html_content += f"""
+            html_parts.append(f"""
                     <tr>
                         <td>{ministry}</td>
                         <td>{count}</td>
                         <td>{percentage}%</td>
-                    </tr>"""
+                    </tr>""")
         
-        html_content += f"""
+        html_parts.append(f"""
                 </tbody>
             </table>
         </div>
@@ -623,13 +709,51 @@ class AIUltimateSpreadsheetGenerator:
         </div>
     </div>
 </body>
-</html>"""
+</html>""")
         
         html_path = self.output_dir / 'ultimate_report.html'
         with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            f.write(''.join(html_parts))
         print(f"  HTML report saved: {html_path}")
     
+    def get_cache_key(self) -> str:
+        """入力Featherファイル・検索パターン・出力カラム指定から結果キャッシュのキーを算出"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.basic_ai_regex.pattern.encode('utf-8'))
+        digest.update(json.dumps(self.output_fields, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+        
+        input_paths = [self.feather_dir / 'full_feather_metadata.json', self.feather_dir / 'column_mapping.json']
+        input_paths += [self.feather_dir / f"{table_name}.feather" for table_name in self.column_mapping]
+        for path in input_paths:
+            if path.exists():
+                stat = path.stat()
+                digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        
+        return digest.hexdigest()
+    
+    def load_cached_result(self, cache_key: str):
+        """キャッシュ済みの収集結果を読み込み（なければNone）"""
+        cache_dir = self.output_dir / '_cache'
+        data_path = cache_dir / f"{cache_key}.feather"
+        if not data_path.exists():
+            return None
+        
+        try:
+            return pd.read_feather(data_path)
+        except Exception as e:
+            print(f"  Cache load error: {e}")
+            return None
+    
+    def save_cached_result(self, cache_key: str, df: pd.DataFrame):
+        """収集結果をキャッシュとして保存"""
+        cache_dir = self.output_dir / '_cache'
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        try:
+            df.to_feather(cache_dir / f"{cache_key}.feather")
+        except Exception as e:
+            print(f"  Cache save error: {e}")
+    
     def run(self):
         """究極のスプレッドシート生成を実行"""
         print("="*90)
@@ -639,22 +763,32 @@ class AIUltimateSpreadsheetGenerator:
         
         start_time = time.time()
         
-        # 1. 全カラムFeatherテーブル読み込み
-        self.load_feather_tables()
-        
-        if not self.tables_data:
-            print("No tables loaded. Exiting.")
-            return None
-        
-        # 2. AI事業の特定
-        ai_projects = self.find_ai_projects()
+        # 入力に変更がなければ前回の収集結果を再利用
+        cache_key = self.get_cache_key() if self.use_cache else None
+        ultimate_df = self.load_cached_result(cache_key) if cache_key else None
         
-        if not ai_projects:
-            print("No AI projects found. Exiting.")
-            return None
-        
-        # 3. 究極のデータ収集（全444カラム）
-        ultimate_df = self.collect_ultimate_data(ai_projects)
+        if ultimate_df is not None:
+            print(f"\\nUsing cached data: {self.output_dir / '_cache' / cache_key}.feather")
+        else:
+            # 1. 全カラムFeatherテーブル読み込み
+            self.load_feather_tables()
+            
+            if not self.arrow_tables:
+                print("No tables loaded. Exiting.")
+                return None
+            
+            # 2. AI事業の特定
+            ai_projects = self.find_ai_projects()
+            
+            if not ai_projects:
+                print("No AI projects found. Exiting.")
+                return None
+            
+            # 3. 究極のデータ収集（全444カラム）
+            ultimate_df = self.collect_ultimate_data(ai_projects)
+            
+            if cache_key:
+                self.save_cached_result(cache_key, ultimate_df)
         
         # 4. 究極のサマリー生成
         ultimate_summary = self.generate_ultimate_summary(ultimate_df)
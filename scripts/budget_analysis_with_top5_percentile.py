@@ -14,11 +14,31 @@ from typing import Dict, List, Any, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Excel出力はxlsxwriterが利用可能ならそちらを使用（openpyxlより高速）
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_ENGINE = 'xlsxwriter'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+# 予算抽出で参照する列
+BUDGET_SOURCE_COLUMNS = ['予算事業ID', '事業名', '府省庁', '局・庁', '事業年度', '事業区分', 'budget_summary_json']
+# 予算JSONの各年度レコードから取り出す予算額
+BUDGET_AMOUNT_COLUMNS = ['当初予算（合計）', '計（歳出予算現額合計）', '執行額（合計）', '翌年度要求額（合計）']
+# 予算JSONの解析失敗を表す番兵
+_PARSE_ERROR = object()
+
 class BudgetAnalyzer:
     def __init__(self, data_path: str):
         self.data_path = Path(data_path)
         self.df = None
-        self.budget_data = []
+        self.budget_data = pd.DataFrame()
         self.output_dir = Path("data/budget_analysis_2024")
         self.output_dir.mkdir(exist_ok=True)
         
@@ -26,136 +46,133 @@ class BudgetAnalyzer:
         """データ読み込み"""
         print("📊 データ読み込み開始...")
         try:
-            self.df = pd.read_feather(self.data_path)
+            # 分析に使う列のみ読み込む（Feather/Arrowの列単位読み込み）
+            self.df = pd.read_feather(self.data_path, columns=BUDGET_SOURCE_COLUMNS)
             print(f"✓ データ読み込み完了: {len(self.df):,}行 × {len(self.df.columns)}列")
             return True
         except Exception as e:
             print(f"❌ データ読み込みエラー: {e}")
             return False
     
-    def extract_budget_data(self) -> List[Dict[str, Any]]:
+    def extract_budget_data(self) -> pd.DataFrame:
         """予算データの詳細抽出"""
         print("\n================================================================================")
         print("1. 2024年度予算データ抽出・分析")
         print("================================================================================")
         
-        budget_records = []
-        projects_with_budget = 0
-        extraction_errors = 0
-        
         print("予算データ抽出中...")
         
-        for idx, row in self.df.iterrows():
-            try:
-                # 基本情報
-                project_info = {
-                    'project_id': row['予算事業ID'],
-                    'project_name': row['事業名'],
-                    'ministry': row['府省庁'],
-                    'agency': row['局・庁'] if pd.notna(row['局・庁']) else '',
-                    'fiscal_year': row['事業年度'],
-                    'project_category': row['事業区分'] if pd.notna(row['事業区分']) else '',
-                }
-                
-                # 予算JSON解析
-                if pd.notna(row['budget_summary_json']) and row['budget_summary_json'] != '[]':
-                    budget_json = json.loads(row['budget_summary_json'])
-                    
-                    if isinstance(budget_json, list) and len(budget_json) > 0:
-                        # 複数年度のデータがある場合は2024年度を探す
-                        budget_2024 = None
-                        total_initial_budget = 0
-                        total_current_budget = 0
-                        total_execution = 0
-                        total_next_year_request = 0
-                        
-                        for budget_record in budget_json:
-                            if isinstance(budget_record, dict):
-                                year = budget_record.get('予算年度', 0)
-                                if year == 2024:
-                                    budget_2024 = budget_record
-                                
-                                # 累積予算額計算
-                                initial = budget_record.get('当初予算（合計）', 0) or 0
-                                current = budget_record.get('計（歳出予算現額合計）', 0) or 0  
-                                execution = budget_record.get('執行額（合計）', 0) or 0
-                                next_request = budget_record.get('翌年度要求額（合計）', 0) or 0
-                                
-                                if isinstance(initial, (int, float)) and initial > 0:
-                                    total_initial_budget += initial
-                                if isinstance(current, (int, float)) and current > 0:
-                                    total_current_budget += current
-                                if isinstance(execution, (int, float)) and execution > 0:
-                                    total_execution += execution
-                                if isinstance(next_request, (int, float)) and next_request > 0:
-                                    total_next_year_request += next_request
-                        
-                        # 2024年度データまたは累積データを使用
-                        if budget_2024:
-                            budget_info = budget_2024
-                        elif total_current_budget > 0:
-                            budget_info = {
-                                '当初予算（合計）': total_initial_budget,
-                                '計（歳出予算現額合計）': total_current_budget,
-                                '執行額（合計）': total_execution,
-                                '翌年度要求額（合計）': total_next_year_request
-                            }
-                        else:
-                            budget_info = budget_json[0]  # 最初のレコードを使用
-                        
-                        # 予算額データ整理
-                        initial_budget = budget_info.get('当初予算（合計）', 0) or 0
-                        current_budget = budget_info.get('計（歳出予算現額合計）', 0) or 0
-                        execution_amount = budget_info.get('執行額（合計）', 0) or 0
-                        next_year_request = budget_info.get('翌年度要求額（合計）', 0) or 0
-                        
-                        # 数値型確保
-                        initial_budget = float(initial_budget) if isinstance(initial_budget, (int, float)) else 0
-                        current_budget = float(current_budget) if isinstance(current_budget, (int, float)) else 0
-                        execution_amount = float(execution_amount) if isinstance(execution_amount, (int, float)) else 0
-                        next_year_request = float(next_year_request) if isinstance(next_year_request, (int, float)) else 0
-                        
-                        # 執行率計算
-                        execution_rate = (execution_amount / current_budget * 100) if current_budget > 0 else 0
-                        
-                        # 予算情報をproject_infoに追加
-                        project_info.update({
-                            'initial_budget': initial_budget,
-                            'current_budget': current_budget,  # これをメイン指標として使用
-                            'execution_amount': execution_amount,
-                            'execution_rate': execution_rate,
-                            'next_year_request': next_year_request,
-                            'has_valid_budget': current_budget > 0
-                        })
-                        
-                        if current_budget > 0:
-                            projects_with_budget += 1
-                            
-                        budget_records.append(project_info)
-                
-            except Exception as e:
-                extraction_errors += 1
-                # エラーでも基本情報は追加（予算は0）
-                project_info.update({
-                    'initial_budget': 0,
-                    'current_budget': 0,
-                    'execution_amount': 0,
-                    'execution_rate': 0,
-                    'next_year_request': 0,
-                    'has_valid_budget': False
-                })
-                budget_records.append(project_info)
-                continue
-        
-        self.budget_data = budget_records
+        # 必要列のみ取り出し、欠損は事前に埋めて行ごとのpd.notna判定を省く
+        source = self.df[BUDGET_SOURCE_COLUMNS].fillna({'局・庁': '', '事業区分': ''})
+        # 予算JSONが空の行は結果に含まれないため、ループ前にまとめて除外
+        budget_json_col = source['budget_summary_json']
+        source = source[budget_json_col.notna() & (budget_json_col != '[]')]
+        
+        budget_info = self.aggregate_budget_amounts(source['budget_summary_json'])
+        
+        # 抽出対象: 予算レコードのある行と、解析エラーの行（予算は0）
+        extracted = source.loc[budget_info.index]
+        
+        initial_budget = budget_info['当初予算（合計）']
+        current_budget = budget_info['計（歳出予算現額合計）']
+        execution_amount = budget_info['執行額（合計）']
+        
+        result = pd.DataFrame({
+            'project_id': extracted['予算事業ID'],
+            'project_name': extracted['事業名'],
+            'ministry': extracted['府省庁'],
+            'agency': extracted['局・庁'],
+            'fiscal_year': extracted['事業年度'],
+            'project_category': extracted['事業区分'],
+            'initial_budget': initial_budget,
+            'current_budget': current_budget,  # これをメイン指標として使用
+            'execution_amount': execution_amount,
+            'execution_rate': np.where(current_budget > 0, execution_amount / current_budget * 100, 0.0),
+            'next_year_request': budget_info['翌年度要求額（合計）'],
+            'has_valid_budget': current_budget > 0,
+        })
+        
+        projects_with_budget = int(result['has_valid_budget'].sum())
+        extraction_errors = int(budget_info['extraction_error'].sum())
+        
+        self.budget_data = result
         
         print(f"✓ 予算データ抽出完了")
-        print(f"  - 総事業数: {len(budget_records):,}")
+        print(f"  - 総事業数: {len(result):,}")
         print(f"  - 予算データ有効事業: {projects_with_budget:,}")
         print(f"  - 抽出エラー: {extraction_errors:,}")
-        print(f"  - 予算データ有効率: {(projects_with_budget/len(budget_records)*100):.1f}%")
+        print(f"  - 予算データ有効率: {(projects_with_budget/len(result)*100):.1f}%")
+        
+        return result
+    
+    def aggregate_budget_amounts(self, budget_json_col: pd.Series) -> pd.DataFrame:
+        """予算JSONを解析し、事業ごとに採用する予算額と抽出エラー有無を集計
+        
+        戻り値は抽出対象行（予算レコードのある行と解析エラーの行）のみで、
+        インデックスはbudget_json_colと同じ。
+        """
+        # 予算JSON解析（解析失敗は抽出エラーとして扱う）
+        parsed = pd.Series([self._parse_budget_json(text) for text in budget_json_col.tolist()],
+                           index=budget_json_col.index, dtype=object)
+        parse_failed = parsed.map(lambda budget_json: budget_json is _PARSE_ERROR).astype(bool)
+        is_record_list = parsed.map(
+            lambda budget_json: isinstance(budget_json, list) and len(budget_json) > 0).astype(bool)
+        record_lists = parsed[is_record_list]
+        
+        # 年度別レコードを縦持ちに展開し、予算額を数値化
+        records = record_lists.explode()
+        records = records[records.map(lambda record: isinstance(record, dict)).astype(bool)]
+        long_df = pd.DataFrame(records.tolist(), index=records.index,
+                               columns=['予算年度'] + BUDGET_AMOUNT_COLUMNS)
+        for col in BUDGET_AMOUNT_COLUMNS:
+            long_df[col] = pd.to_numeric(long_df[col], errors='coerce').astype(float).fillna(0.0)
+        
+        # 2024年度レコード（複数ある場合は最後のもの）
+        records_2024 = long_df.loc[long_df['予算年度'] == 2024, BUDGET_AMOUNT_COLUMNS]
+        records_2024 = records_2024[~records_2024.index.duplicated(keep='last')]
+        has_2024 = record_lists.index.isin(records_2024.index)
+        
+        # 正の値のみの累積予算額
+        amounts = long_df[BUDGET_AMOUNT_COLUMNS]
+        totals = (amounts.where(amounts > 0, 0.0)
+                  .groupby(level=0, sort=False).sum()
+                  .reindex(record_lists.index, fill_value=0.0))
+        use_totals = ~has_2024 & (totals['計（歳出予算現額合計）'] > 0).to_numpy()
+        
+        # どちらもなければ先頭レコード（辞書でなければ抽出エラー）
+        first_is_dict = record_lists.map(lambda budget_json: isinstance(budget_json[0], dict)).astype(bool)
+        use_first = ~has_2024 & ~use_totals & first_is_dict.to_numpy()
+        first_not_dict = ~has_2024 & ~use_totals & ~first_is_dict.to_numpy()
+        first_records = long_df.loc[~long_df.index.duplicated(keep='first'), BUDGET_AMOUNT_COLUMNS]
+        
+        budget_info = pd.concat([
+            records_2024,
+            totals[use_totals],
+            first_records.loc[record_lists.index[use_first]],
+        ])
         
-        return budget_records
+        extracted_index = budget_json_col.index[(is_record_list | parse_failed).to_numpy()]
+        budget_info = budget_info.reindex(extracted_index, fill_value=0.0)
+        budget_info['extraction_error'] = (
+            parse_failed.reindex(extracted_index).to_numpy()
+            | extracted_index.isin(record_lists.index[first_not_dict])
+        )
+        return budget_info
+    
+    @staticmethod
+    def _to_records(projects: pd.DataFrame) -> List[Dict[str, Any]]:
+        """事業DataFrameを辞書リストに変換（値はPythonの組み込み型）"""
+        columns = list(projects.columns)
+        return [dict(zip(columns, values))
+                for values in zip(*(projects[col].tolist() for col in columns))]
+    
+    @staticmethod
+    def _parse_budget_json(text: str) -> Any:
+        """予算JSONを解析（失敗時は_PARSE_ERRORを返す）"""
+        try:
+            return orjson.loads(text) if ORJSON_AVAILABLE else json.loads(text)
+        except Exception:
+            return _PARSE_ERROR
     
     def calculate_budget_statistics(self) -> Dict[str, Any]:
         """予算統計計算"""
@@ -164,30 +181,23 @@ class BudgetAnalyzer:
         print("================================================================================")
         
         # 有効な予算データのみフィルタ
-        valid_budgets = [p for p in self.budget_data if p['has_valid_budget']]
+        valid_budgets = self.budget_data[self.budget_data['has_valid_budget']]
         
-        if not valid_budgets:
+        if valid_budgets.empty:
             print("❌ 有効な予算データが見つかりません")
             return {}
         
-        # 予算額リスト作成
-        current_budgets = [p['current_budget'] for p in valid_budgets]
-        initial_budgets = [p['initial_budget'] for p in valid_budgets]
-        execution_amounts = [p['execution_amount'] for p in valid_budgets]
-        execution_rates = [p['execution_rate'] for p in valid_budgets if p['execution_rate'] > 0]
-        
-        # 基本統計
-        current_budgets_sorted = sorted(current_budgets, reverse=True)
+        # 予算額を配列化（以降の統計は配列上で計算）
+        current_budgets = valid_budgets['current_budget'].to_numpy(dtype=float)
+        execution_rates = valid_budgets['execution_rate'].to_numpy(dtype=float)
+        execution_rates = execution_rates[execution_rates > 0]
         
-        # パーセンタイル計算
-        percentile_99 = np.percentile(current_budgets, 99) if current_budgets else 0
-        percentile_95 = np.percentile(current_budgets, 95) if current_budgets else 0
-        percentile_90 = np.percentile(current_budgets, 90) if current_budgets else 0
-        percentile_75 = np.percentile(current_budgets, 75) if current_budgets else 0
-        percentile_50 = np.percentile(current_budgets, 50) if current_budgets else 0
+        # パーセンタイル計算（1回の呼び出しでまとめて算出、内部は部分選択で全ソートしない）
+        percentile_50, percentile_75, percentile_90, percentile_95, percentile_99 = np.percentile(
+            current_budgets, [50, 75, 90, 95, 99])
         
         # 上位1%事業数
-        top_1_percent_count = len([b for b in current_budgets if b >= percentile_99])
+        top_1_percent_count = int(np.count_nonzero(current_budgets >= percentile_99))
         
         stats = {
             'total_projects': len(self.budget_data),
@@ -196,12 +206,12 @@ class BudgetAnalyzer:
             
             # 現行予算統計
             'current_budget_stats': {
-                'mean': np.mean(current_budgets) if current_budgets else 0,
-                'median': np.median(current_budgets) if current_budgets else 0,
-                'std': np.std(current_budgets) if current_budgets else 0,
-                'min': min(current_budgets) if current_budgets else 0,
-                'max': max(current_budgets) if current_budgets else 0,
-                'total': sum(current_budgets) if current_budgets else 0
+                'mean': current_budgets.mean(),
+                'median': np.median(current_budgets),
+                'std': current_budgets.std(),
+                'min': current_budgets.min(),
+                'max': current_budgets.max(),
+                'total': current_budgets.sum()
             },
             
             # パーセンタイル
@@ -217,14 +227,14 @@ class BudgetAnalyzer:
             'top_1_percent': {
                 'threshold': percentile_99,
                 'count': top_1_percent_count,
-                'percentage': (top_1_percent_count / len(valid_budgets)) * 100 if valid_budgets else 0
+                'percentage': (top_1_percent_count / len(valid_budgets)) * 100
             },
             
             # 執行率統計
             'execution_stats': {
-                'mean_rate': np.mean(execution_rates) if execution_rates else 0,
-                'median_rate': np.median(execution_rates) if execution_rates else 0,
-                'projects_with_execution': len(execution_rates)
+                'mean_rate': execution_rates.mean() if execution_rates.size else 0,
+                'median_rate': np.median(execution_rates) if execution_rates.size else 0,
+                'projects_with_execution': int(execution_rates.size)
             }
         }
         
@@ -253,31 +263,33 @@ class BudgetAnalyzer:
         
         return stats
     
-    def identify_top_1_percent_projects(self, stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def identify_top_1_percent_projects(self, stats: Dict[str, Any]) -> pd.DataFrame:
         """上位1%事業の特定"""
         print("\n================================================================================")
         print("3. 上位1%事業特定・リスト作成")
         print("================================================================================")
         
+        if 'top_1_percent' not in stats:
+            # 有効な予算データがなく統計が空の場合は空の事業リストを返す
+            print("❌ 予算統計がないため上位1%事業を特定できません")
+            return self.budget_data.iloc[:0].assign(budget_rank=np.arange(0))
+        
         threshold = stats['top_1_percent']['threshold']
         
         # 上位1%事業フィルタリング
-        top_projects = []
-        for project in self.budget_data:
-            if project['has_valid_budget'] and project['current_budget'] >= threshold:
-                top_projects.append(project)
+        budget = self.budget_data
+        top_projects = budget[budget['has_valid_budget'] & (budget['current_budget'] >= threshold)]
         
-        # 予算額でソート
-        top_projects.sort(key=lambda x: x['current_budget'], reverse=True)
+        # 予算額でソート（同額は元の順序を維持）
+        top_projects = top_projects.sort_values('current_budget', ascending=False, kind='stable')
         
         # ランキング追加
-        for i, project in enumerate(top_projects, 1):
-            project['budget_rank'] = i
+        top_projects = top_projects.assign(budget_rank=np.arange(1, len(top_projects) + 1))
         
         print(f"✓ 上位1%事業特定完了: {len(top_projects)}事業")
         print()
         print("上位10事業:")
-        for i, project in enumerate(top_projects[:10], 1):
+        for i, project in enumerate(self._to_records(top_projects.head(10)), 1):
             print(f"  {i:2}. {project['project_name'][:50]}...")
             print(f"      府省庁: {project['ministry']}")
             print(f"      予算額: {project['current_budget']:,.0f}円")
@@ -286,57 +298,53 @@ class BudgetAnalyzer:
         
         return top_projects
     
-    def analyze_ministry_budget_distribution(self, top_projects: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_ministry_budget_distribution(self, top_projects: pd.DataFrame) -> Dict[str, Any]:
         """府省庁別予算分析"""
         print("\n================================================================================")
         print("4. 府省庁別予算分析")  
         print("================================================================================")
         
         # 全体の府省庁別予算
-        ministry_budgets = {}
-        for project in self.budget_data:
-            if project['has_valid_budget']:
-                ministry = project['ministry']
-                if ministry not in ministry_budgets:
-                    ministry_budgets[ministry] = {
-                        'total_budget': 0,
-                        'project_count': 0,
-                        'projects': []
-                    }
-                ministry_budgets[ministry]['total_budget'] += project['current_budget']
-                ministry_budgets[ministry]['project_count'] += 1
-                ministry_budgets[ministry]['projects'].append(project)
+        valid = self.budget_data[self.budget_data['has_valid_budget']]
+        ministry_summary = self._summarize_by_ministry(valid)
+        ministry_budgets = {
+            ministry: {'total_budget': total_budget, 'project_count': project_count}
+            for ministry, total_budget, project_count in zip(
+                ministry_summary.index,
+                ministry_summary['total_budget'].tolist(),
+                ministry_summary['project_count'].tolist()
+            )
+        }
         
         # 上位1%の府省庁別分布
-        top_ministry_distribution = {}
-        for project in top_projects:
-            ministry = project['ministry']
-            if ministry not in top_ministry_distribution:
-                top_ministry_distribution[ministry] = {
-                    'project_count': 0,
-                    'total_budget': 0,
-                    'projects': []
-                }
-            top_ministry_distribution[ministry]['project_count'] += 1
-            top_ministry_distribution[ministry]['total_budget'] += project['current_budget']
-            top_ministry_distribution[ministry]['projects'].append(project)
-        
-        # 府省庁を予算額でソート
-        ministry_ranking = sorted(ministry_budgets.items(), 
-                                key=lambda x: x[1]['total_budget'], reverse=True)
-        
-        top_ministry_ranking = sorted(top_ministry_distribution.items(),
-                                    key=lambda x: x[1]['project_count'], reverse=True)
+        top_summary = self._summarize_by_ministry(top_projects)
+        top_ministry_distribution = {
+            ministry: {'project_count': project_count, 'total_budget': total_budget}
+            for ministry, total_budget, project_count in zip(
+                top_summary.index,
+                top_summary['total_budget'].tolist(),
+                top_summary['project_count'].tolist()
+            )
+        }
         
+        # 府省庁を予算額でソート（同値は出現順）
+        ministry_ranking = [(ministry, ministry_budgets[ministry])
+                            for ministry in ministry_summary.nlargest(10, 'total_budget').index]
+        
+        top_ministry_ranking = [(ministry, top_ministry_distribution[ministry])
+                                for ministry in top_summary.sort_values(
+                                    'project_count', ascending=False, kind='stable').index]
+        
+        # 府省庁別の事業一覧はJSON保存時にのみ作成（save_analysis_results参照）
         analysis = {
             'all_ministries': ministry_budgets,
             'top_1_percent_ministries': top_ministry_distribution,
-            'ministry_budget_ranking': ministry_ranking[:10],
+            'ministry_budget_ranking': ministry_ranking,
             'top_projects_ministry_ranking': top_ministry_ranking
         }
         
         print("全体予算上位10府省庁:")
-        for i, (ministry, data) in enumerate(ministry_ranking[:10], 1):
+        for i, (ministry, data) in enumerate(ministry_ranking, 1):
             avg_budget = data['total_budget'] / data['project_count'] if data['project_count'] > 0 else 0
             print(f"  {i:2}. {ministry}")
             print(f"      総予算: {data['total_budget']:,.0f}円")
@@ -355,37 +363,77 @@ class BudgetAnalyzer:
         
         return analysis
     
-    def create_top_projects_list(self, top_projects: List[Dict[str, Any]]):
+    @staticmethod
+    def _summarize_by_ministry(projects: pd.DataFrame) -> pd.DataFrame:
+        """府省庁別の総予算・事業数（府省庁は出現順）"""
+        return projects.groupby('ministry', sort=False).agg(
+            total_budget=('current_budget', 'sum'),
+            project_count=('current_budget', 'size')
+        )
+    
+    def _ministry_analysis_with_projects(self, ministry_analysis: Dict[str, Any],
+                                         top_projects: pd.DataFrame) -> Dict[str, Any]:
+        """府省庁別分析に事業一覧を付与（JSON出力用）"""
+        # 上位1%事業は順位付きのレコードを使う
+        top_records = dict(zip(top_projects.index, self._to_records(top_projects)))
+        valid = self.budget_data[self.budget_data['has_valid_budget']]
+        all_projects = {}
+        for index, project in zip(valid.index, self._to_records(valid)):
+            all_projects.setdefault(project['ministry'], []).append(top_records.get(index, project))
+        top_ministry_projects = {}
+        for project in top_records.values():
+            top_ministry_projects.setdefault(project['ministry'], []).append(project)
+        
+        all_ministries = {
+            ministry: {**data, 'projects': all_projects[ministry]}
+            for ministry, data in ministry_analysis['all_ministries'].items()
+        }
+        top_ministries = {
+            ministry: {**data, 'projects': top_ministry_projects[ministry]}
+            for ministry, data in ministry_analysis['top_1_percent_ministries'].items()
+        }
+        return {
+            'all_ministries': all_ministries,
+            'top_1_percent_ministries': top_ministries,
+            'ministry_budget_ranking': [
+                (ministry, all_ministries[ministry])
+                for ministry, _ in ministry_analysis['ministry_budget_ranking']
+            ],
+            'top_projects_ministry_ranking': [
+                (ministry, top_ministries[ministry])
+                for ministry, _ in ministry_analysis['top_projects_ministry_ranking']
+            ]
+        }
+    
+    def create_top_projects_list(self, top_projects: pd.DataFrame):
         """上位1%事業リスト作成（CSV/Excel）"""
         print("\n================================================================================")
         print("5. 上位1%事業リスト出力")
         print("================================================================================")
         
         # DataFrame作成
-        df_top = pd.DataFrame([
-            {
-                'ランキング': p['budget_rank'],
-                '事業名': p['project_name'],
-                '府省庁': p['ministry'],
-                '局・庁': p['agency'],
-                '事業区分': p['project_category'],
-                '当初予算額': int(p['initial_budget']),
-                '現行予算額': int(p['current_budget']),
-                '執行額': int(p['execution_amount']),
-                '執行率(%)': round(p['execution_rate'], 1),
-                '次年度要求額': int(p['next_year_request']),
-                '事業ID': p['project_id'],
-                '年度': p['fiscal_year']
-            }
-            for p in top_projects
-        ])
+        df_top = pd.DataFrame({
+            'ランキング': top_projects['budget_rank'].tolist(),
+            '事業名': top_projects['project_name'].tolist(),
+            '府省庁': top_projects['ministry'].tolist(),
+            '局・庁': top_projects['agency'].tolist(),
+            '事業区分': top_projects['project_category'].tolist(),
+            '当初予算額': top_projects['initial_budget'].astype('int64').tolist(),
+            '現行予算額': top_projects['current_budget'].astype('int64').tolist(),
+            '執行額': top_projects['execution_amount'].astype('int64').tolist(),
+            '執行率(%)': [round(rate, 1) for rate in top_projects['execution_rate'].tolist()],
+            '次年度要求額': top_projects['next_year_request'].astype('int64').tolist(),
+            '事業ID': top_projects['project_id'].tolist(),
+            '年度': top_projects['fiscal_year'].tolist()
+        })
         
         # ファイル出力
         csv_path = self.output_dir / "top_1_percent_projects.csv"
         excel_path = self.output_dir / "top_1_percent_projects.xlsx"
         
         df_top.to_csv(csv_path, index=False, encoding='utf-8-sig')
-        df_top.to_excel(excel_path, index=False, sheet_name='上位1%事業リスト')
+        with pd.ExcelWriter(excel_path, engine=EXCEL_ENGINE) as writer:
+            df_top.to_excel(writer, index=False, sheet_name='上位1%事業リスト')
         
         print(f"✓ CSV出力完了: {csv_path}")
         print(f"✓ Excel出力完了: {excel_path}")
@@ -394,7 +442,7 @@ class BudgetAnalyzer:
         return df_top
     
     def create_enhanced_html_report(self, stats: Dict[str, Any], 
-                                  top_projects: List[Dict[str, Any]],
+                                  top_projects: pd.DataFrame,
                                   ministry_analysis: Dict[str, Any]):
         """拡張HTMLレポート生成"""
         print("\n================================================================================")
@@ -409,9 +457,8 @@ class BudgetAnalyzer:
         # 予算統計
         budget_stats = stats['current_budget_stats']
         percentiles = stats['percentiles']
-        top_5_info = stats['top_5_percent']
         
-        html_content = f"""<!DOCTYPE html>
+        html_header = f"""<!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="UTF-8">
@@ -468,7 +515,7 @@ class BudgetAnalyzer:
         <div class="insight">2. 上位1%事業の予算閾値は{percentiles['p99']:,.0f}円（約{percentiles['p99']/1e8:.1f}億円）</div>
         <div class="insight">3. 平均事業予算は{budget_stats['mean']:,.0f}円、中央値は{budget_stats['median']:,.0f}円</div>
         <div class="insight">4. 最大事業予算は{budget_stats['max']:,.0f}円（約{budget_stats['max']/1e12:.2f}兆円）</div>
-        <div class="insight">5. 上位1%事業が全体予算の{sum(p['current_budget'] for p in top_projects)/budget_stats['total']*100:.1f}%を占める</div>
+        <div class="insight">5. 上位1%事業が全体予算の{top_projects['current_budget'].sum()/budget_stats['total']*100:.1f}%を占める</div>
         
         <h2>📊 予算規模統計</h2>
         <table>
@@ -531,34 +578,48 @@ class BudgetAnalyzer:
                 <th>規模</th>
             </tr>"""
         
+        html_parts = [html_header]
+        
+        # 予算規模による分類（1兆円以上: 超大規模、1000億円以上: 大規模）
+        budget_amounts = top_projects['current_budget'].to_numpy()
+        tier_conditions = [budget_amounts >= 1e12, budget_amounts >= 1e11]
+        tier_classes = np.select(tier_conditions, ['tier-mega', 'tier-large'], default='tier-medium')
+        tier_labels = np.select(tier_conditions, ['超大規模', '大規模'], default='中規模')
+        
         # 全上位1%事業のテーブル
-        for project in top_projects:
-            # 予算規模による分類
-            budget_amount = project['current_budget']
-            if budget_amount >= 1e12:  # 1兆円以上
-                tier_class = "tier-mega"
-                tier_label = "超大規模"
-            elif budget_amount >= 1e11:  # 1000億円以上
-                tier_class = "tier-large" 
-                tier_label = "大規模"
-            else:
-                tier_class = "tier-medium"
-                tier_label = "中規模"
-            
-            execution_rate = f"{project['execution_rate']:.1f}%" if project['execution_rate'] > 0 else "未執行"
-            
-            html_content += f"""
+        project_row_template = """
             <tr>
-                <td>{project['budget_rank']}</td>
-                <td class="project-name">{project['project_name'][:80]}{'...' if len(project['project_name']) > 80 else ''}</td>
-                <td>{project['ministry']}</td>
-                <td class="number">{budget_amount:,.0f}</td>
-                <td class="number">{budget_amount/1e8:.1f}</td>
+                <td>{rank}</td>
+                <td class="project-name">{name}</td>
+                <td>{ministry}</td>
+                <td class="number">{budget:,.0f}</td>
+                <td class="number">{budget_oku:.1f}</td>
                 <td class="number">{execution_rate}</td>
                 <td><span class="budget-tier {tier_class}">{tier_label}</span></td>
             </tr>"""
-        
-        html_content += """
+        html_parts.extend(
+            project_row_template.format(
+                rank=rank,
+                name=project_name[:80] + ('...' if len(project_name) > 80 else ''),
+                ministry=ministry,
+                budget=budget_amount,
+                budget_oku=budget_amount / 1e8,
+                execution_rate=f"{execution_rate:.1f}%" if execution_rate > 0 else "未執行",
+                tier_class=tier_class,
+                tier_label=tier_label
+            )
+            for rank, project_name, ministry, budget_amount, execution_rate, tier_class, tier_label in zip(
+                top_projects['budget_rank'].tolist(),
+                top_projects['project_name'].tolist(),
+                top_projects['ministry'].tolist(),
+                top_projects['current_budget'].tolist(),
+                top_projects['execution_rate'].tolist(),
+                tier_classes.tolist(),
+                tier_labels.tolist()
+            )
+        )
+        
+        html_parts.append("""
         </table>
         
         <h2>🏛️ 府省庁別上位1%事業分布</h2>
@@ -569,23 +630,23 @@ class BudgetAnalyzer:
                 <th>割合</th>
                 <th>総予算額（億円）</th>
                 <th>平均予算額（億円）</th>
-            </tr>"""
+            </tr>""")
         
         # 府省庁別上位1%分布
         for ministry, data in ministry_analysis['top_projects_ministry_ranking']:
             percentage = (data['project_count'] / len(top_projects)) * 100
             avg_budget = data['total_budget'] / data['project_count'] if data['project_count'] > 0 else 0
             
-            html_content += f"""
+            html_parts.append(f"""
             <tr>
                 <td>{ministry}</td>
                 <td class="number">{data['project_count']:,}</td>
                 <td class="number">{percentage:.1f}%</td>
                 <td class="number">{data['total_budget']/1e8:.1f}</td>
                 <td class="number">{avg_budget/1e8:.1f}</td>
-            </tr>"""
+            </tr>""")
         
-        html_content += f"""
+        html_parts.append(f"""
         </table>
         
         <div style="text-align: center; margin-top: 40px; color: #7f8c8d; font-size: 0.9em;">
@@ -595,32 +656,33 @@ class BudgetAnalyzer:
         </div>
     </div>
 </body>
-</html>"""
+</html>""")
         
         # HTMLファイル出力
         html_path = self.output_dir / "budget_analysis_with_top1_report.html"
         with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            f.write(''.join(html_parts))
         
         print(f"✓ 拡張HTMLレポート生成完了: {html_path}")
         return html_path
     
     def save_analysis_results(self, stats: Dict[str, Any], 
-                            top_projects: List[Dict[str, Any]],
+                            top_projects: pd.DataFrame,
                             ministry_analysis: Dict[str, Any]):
         """分析結果をJSON形式で保存"""
         
+        top_budget = top_projects['current_budget'].sum()
         results = {
             'analysis_date': pd.Timestamp.now().isoformat(),
             'budget_statistics': stats,
-            'top_5_percent_projects': top_projects,
-            'ministry_analysis': ministry_analysis,
+            'top_5_percent_projects': self._to_records(top_projects),
+            'ministry_analysis': self._ministry_analysis_with_projects(ministry_analysis, top_projects),
             'summary': {
                 'total_projects': stats['total_projects'],
                 'top_5_percent_count': len(top_projects),
                 'total_budget': stats['current_budget_stats']['total'],
-                'top_5_percent_budget': sum(p['current_budget'] for p in top_projects),
-                'top_5_percent_share': (sum(p['current_budget'] for p in top_projects) / 
+                'top_5_percent_budget': top_budget,
+                'top_5_percent_share': (top_budget / 
                                       stats['current_budget_stats']['total']) * 100
             }
         }
@@ -653,7 +715,7 @@ class BudgetAnalyzer:
                 return False
             
             # 3. 上位5%事業特定
-            top_projects = self.identify_top_5_percent_projects(stats)
+            top_projects = self.identify_top_1_percent_projects(stats)
             
             # 4. 府省庁別分析
             ministry_analysis = self.analyze_ministry_budget_distribution(top_projects)
@@ -679,7 +741,7 @@ class BudgetAnalyzer:
                 f.write(f"  • 政府総予算額: {stats['current_budget_stats']['total']:,.0f}円 (約{stats['current_budget_stats']['total']/1e12:.1f}兆円)\n")
                 f.write(f"  • 上位5%事業数: {len(top_projects):,}\n")
                 f.write(f"  • 上位5%予算閾値: {stats['percentiles']['p95']:,.0f}円 (約{stats['percentiles']['p95']/1e8:.0f}億円)\n")
-                f.write(f"  • 上位5%事業の予算集中度: {sum(p['current_budget'] for p in top_projects)/stats['current_budget_stats']['total']*100:.1f}%\n\n")
+                f.write(f"  • 上位5%事業の予算集中度: {top_projects['current_budget'].sum()/stats['current_budget_stats']['total']*100:.1f}%\n\n")
                 
                 f.write("📊 予算規模分布:\n")
                 f.write(f"  • 平均事業予算: {stats['current_budget_stats']['mean']:,.0f}円\n")
@@ -705,7 +767,7 @@ class BudgetAnalyzer:
             print(f"  • 上位5%事業数: {len(top_projects):,} ({(len(top_projects)/stats['projects_with_budget']*100):.1f}%)")
             print(f"  • 上位5%予算閾値: {stats['percentiles']['p95']:,.0f}円 (約{stats['percentiles']['p95']/1e8:.0f}億円)")
             print(f"  • 最大事業予算: {stats['current_budget_stats']['max']:,.0f}円 (約{stats['current_budget_stats']['max']/1e12:.2f}兆円)")
-            print(f"  • 上位5%予算集中度: {sum(p['current_budget'] for p in top_projects)/stats['current_budget_stats']['total']*100:.1f}%")
+            print(f"  • 上位5%予算集中度: {top_projects['current_budget'].sum()/stats['current_budget_stats']['total']*100:.1f}%")
             
             return True
             